@@ -1,60 +1,196 @@
+import json
 import math
+import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from datetime import datetime
 import geohash2
+import numpy as np
+
+try:
+    import mapbox_earcut as earcut
+except ImportError:  # optional compiled earcut, preferred for roofs when present
+    earcut = None
+
+# numba only backs the ear clipper, which earcut replaces; skip its import cost
+nb = None
+if earcut is None:
+    try:
+        import numba as nb
+    except ImportError:  # numba is optional, fall back to the pure-Python ear clipper
+        pass
+
+# Overpass helpers live in the sibling "sandbox project" checkout; resolve
+# them once at import rather than on every fetch.
+_SANDBOX_PROJECT = Path(__file__).resolve().parent / "sandbox project"
+if str(_SANDBOX_PROJECT) not in sys.path:
+    sys.path.append(str(_SANDBOX_PROJECT))
+
+try:
+    from geo.bounding_box import bounding_square
+    from geo.overpass import fetch_buildings, overpass_to_geojson
+except ImportError:
+    bounding_square = fetch_buildings = overpass_to_geojson = None
+
+# Equirectangular (flat-earth) projection around the query point. Scale
+# error is a fraction of a percent over the km-scale areas we fetch; switch
+# to an ellipsoidal WGS84 projection if larger tiles ever need that precision.
+METERS_PER_DEG_LAT = 111_320.0
+
+def _cross2(ax, az, bx, bz, cx, cz):
+    """
+    2x2 determinant of (b - a, c - a): twice the signed area of triangle abc,
+    positive when a -> b -> c turns counter-clockwise. Works elementwise on arrays.
+    """
+    return (bx - ax) * (cz - az) - (bz - az) * (cx - ax)
+
 
 def ensure_ccw(points):
     """Ensure polygon is counter-clockwise (XZ plane)."""
-    area = 0.0
-    for i in range(len(points)):
-        x1, z1 = points[i]
-        x2, z2 = points[(i + 1) % len(points)]
-        area += (x2 - x1) * (z2 + z1)
-    if area > 0:  # clockwise
-        return list(reversed(points))
-    return points
+    p = np.asarray(points, dtype=np.float64)
+    x = p[:, 0]
+    z = p[:, 1]
+    # Fan of triangles from vertex 0 sums to the polygon's signed area
+    area = _cross2(x[0], z[0], x[1:-1], z[1:-1], x[2:], z[2:]).sum()
+    if area < 0:  # clockwise
+        return p[::-1]
+    return p
+
+
+if nb is not None:
+    _cross2_nb = nb.njit(cache=True, inline="always")(_cross2)
+
+    @nb.njit(cache=True)
+    def _triangulate_polygon_nb(points):
+        """
+        JIT-compiled ear clipping over a (n, 2) float64 array.
+        Returns an (m, 3) int32 array of index triplets.
+        """
+        n = points.shape[0]
+        indices = np.empty(n, np.int32)
+        for k in range(n):
+            indices[k] = k
+        count = n
+
+        triangles = np.empty((max(n - 2, 0), 3), np.int32)
+        tri_count = 0
+        cursor = 0
+
+        while count > 2:
+            ear_found = False
+            for step in range(count):
+                i = (cursor + step) % count
+                prev_i = indices[(i - 1) % count]
+                curr_i = indices[i]
+                next_i = indices[(i + 1) % count]
+
+                ax, az = points[prev_i, 0], points[prev_i, 1]
+                bx, bz = points[curr_i, 0], points[curr_i, 1]
+                cx, cz = points[next_i, 0], points[next_i, 1]
+
+                if _cross2_nb(ax, az, bx, bz, cx, cz) <= 0:
+                    continue
+
+                ear = True
+                for k in range(count):
+                    other = indices[k]
+                    if other == prev_i or other == curr_i or other == next_i:
+                        continue
+                    px, pz = points[other, 0], points[other, 1]
+                    b1 = _cross2_nb(px, pz, ax, az, bx, bz) < 0.0
+                    b2 = _cross2_nb(px, pz, bx, bz, cx, cz) < 0.0
+                    b3 = _cross2_nb(px, pz, cx, cz, ax, az) < 0.0
+                    if b1 == b2 and b2 == b3:
+                        ear = False
+                        break
+
+                if ear:
+                    triangles[tri_count, 0] = prev_i
+                    triangles[tri_count, 1] = curr_i
+                    triangles[tri_count, 2] = next_i
+                    tri_count += 1
+                    for k in range(i, count - 1):
+                        indices[k] = indices[k + 1]
+                    count -= 1
+                    # Resume next to the clipped ear instead of rescanning from 0
+                    cursor = i - 1 if i > 0 else count - 1
+                    ear_found = True
+                    break
+
+            if not ear_found:
+                break  # polygon may be degenerate
+
+        return triangles[:tri_count]
+
+
+# Ring size from which the NumPy candidate test beats the scalar loop
+# (measured break-even is ~150-200 vertices; most footprints are far smaller)
+_VECTOR_EAR_TEST_MIN = 160
 
 
 def triangulate_polygon(points):
     """
     Basic ear clipping triangulation.
     Assumes simple polygon (no holes, no self-intersections).
-    Returns list of index triplets.
+    Returns an (m, 3) int32 array of index triplets.
     """
-    def area(a, b, c):
-        return (b[0]-a[0])*(c[1]-a[1]) - (b[1]-a[1])*(c[0]-a[0])
-
-    def is_point_in_triangle(p, a, b, c):
-        b1 = area(p, a, b) < 0.0
-        b2 = area(p, b, c) < 0.0
-        b3 = area(p, c, a) < 0.0
-        return (b1 == b2) and (b2 == b3)
-
+    if nb is not None:
+        return _triangulate_polygon_nb(np.asarray(points, dtype=np.float64))
+
+    points = np.asarray(points, dtype=np.float64)
+    xs = points[:, 0]
+    zs = points[:, 1]
+    # Plain floats for the per-ear scalar work, arrays for the candidate tests
+    coords = points.tolist()
     indices = list(range(len(points)))
     triangles = []
 
     while len(indices) > 2:
+        count = len(indices)
+        vectorized = count >= _VECTOR_EAR_TEST_MIN
+        if vectorized:
+            remaining = np.array(indices)
+
         ear_found = False
-        for i in range(len(indices)):
+        for i in range(count):
             prev_i = indices[i - 1]
             curr_i = indices[i]
-            next_i = indices[(i + 1) % len(indices)]
+            next_i = indices[(i + 1) % count]
 
-            a = points[prev_i]
-            b = points[curr_i]
-            c = points[next_i]
+            ax, az = coords[prev_i]
+            bx, bz = coords[curr_i]
+            cx, cz = coords[next_i]
 
-            if area(a, b, c) <= 0:
+            if _cross2(ax, az, bx, bz, cx, cz) <= 0:
                 continue
 
             ear = True
-            for other in indices:
-                if other in (prev_i, curr_i, next_i):
-                    continue
-                if is_point_in_triangle(points[other], a, b, c):
-                    ear = False
-                    break
+            if vectorized:
+                # Same-side test for every other remaining vertex at once:
+                # inside iff all three edge signs agree.
+                others = remaining[(remaining != prev_i) & (remaining != curr_i) & (remaining != next_i)]
+                px = xs[others]
+                pz = zs[others]
+                s1 = _cross2(ax, az, bx, bz, px, pz) < 0.0
+                s2 = _cross2(bx, bz, cx, cz, px, pz) < 0.0
+                s3 = _cross2(cx, cz, ax, az, px, pz) < 0.0
+                ear = not np.any((s1 == s2) & (s2 == s3))
+            else:
+                for other in indices:
+                    if other == prev_i or other == curr_i or other == next_i:
+                        continue
+                    px, pz = coords[other]
+                    b1 = _cross2(px, pz, ax, az, bx, bz) < 0.0
+                    b2 = _cross2(px, pz, bx, bz, cx, cz) < 0.0
+                    if b1 != b2:
+                        continue
+                    b3 = _cross2(px, pz, cx, cz, ax, az) < 0.0
+                    if b2 == b3:
+                        ear = False
+                        break
 
             if ear:
                 triangles.append((prev_i, curr_i, next_i))
@@ -65,7 +201,7 @@ def triangulate_polygon(points):
         if not ear_found:
             break  # polygon may be degenerate
 
-    return triangles
+    return np.asarray(triangles, dtype=np.int32).reshape(-1, 3)
 
 def _building_height_meters(props):
     if "height" in props:
@@ -82,68 +218,102 @@ def _building_height_meters(props):
 
     return 10.0  # fallback default
     
+@lru_cache(maxsize=256)
+def _wall_triangles(n):
+    """
+    Wall index buffer for a ring of n bottom + n top vertices,
+    two triangles per edge. Shared between calls, so read-only.
+    """
+    i = np.arange(n, dtype=np.int32)
+    next_i = (i + 1) % n
+    walls = np.stack(
+        [i, next_i, next_i + n, i, next_i + n, i + n], axis=1
+    ).reshape(-1, 3)
+    walls.flags.writeable = False
+    return walls
+
 def extrude_footprint(points_xz, height):
     """
     Extrudes 2D polygon (XZ) into 3D solid.
+    points_xz: (n, 2) array-like of footprint coordinates.
     Returns:
-        vertices: [(x,y,z), ...]
-        triangles: [(a,b,c), ...]
+        vertices: (2n, 3) float64 array, bottom ring then top ring
+        triangles: (m, 3) int32 array of vertex indices
     """
+    points_xz = np.asarray(points_xz, dtype=np.float64)
 
     # Remove duplicate closing point
-    if len(points_xz) > 2 and points_xz[0] == points_xz[-1]:
+    if len(points_xz) > 2 and np.array_equal(points_xz[0], points_xz[-1]):
         points_xz = points_xz[:-1]
 
     if len(points_xz) < 3:
-        return [], []
+        return np.empty((0, 3), np.float64), np.empty((0, 3), np.int32)
 
     points_xz = ensure_ccw(points_xz)
     n = len(points_xz)
-
-    vertices = []
-    triangles = []
-
-    # Bottom vertices
-    for x, z in points_xz:
-        vertices.append((x, 0.0, z))
-
-    # Top vertices
-    for x, z in points_xz:
-        vertices.append((x, height, z))
+    xs = points_xz[:, 0]
+    zs = points_xz[:, 1]
+
+    # Bottom vertices, then top vertices
+    vertices = np.empty((2 * n, 3), np.float64)
+    vertices[:n, 0] = xs
+    vertices[:n, 1] = 0.0
+    vertices[:n, 2] = zs
+    vertices[n:, 0] = xs
+    vertices[n:, 1] = height
+    vertices[n:, 2] = zs
 
     # --- Roof ---
-    roof_tris = triangulate_polygon(points_xz)
-    for a, b, c in roof_tris:
-        triangles.append((a + n, b + n, c + n))
+    # Walls still rely on ensure_ccw; earcut orients roof triangles itself.
+    if earcut is not None:
+        roof_tris = earcut.triangulate_float64(
+            points_xz, np.array([n], dtype=np.uint32)
+        ).reshape(-1, 3)
+    else:
+        roof_tris = triangulate_polygon(points_xz)
+    roof_tris = np.asarray(roof_tris, dtype=np.int32).reshape(-1, 3)
 
     # --- Floor (reverse winding) ---
-    for a, b, c in roof_tris:
-        triangles.append((c, b, a))
+    floor_tris = roof_tris[:, ::-1]
 
     # --- Walls ---
-    for i in range(n):
-        next_i = (i + 1) % n
-
-        bottom_i = i
-        bottom_next = next_i
-        top_i = i + n
-        top_next = next_i + n
-
-        triangles.append((bottom_i, bottom_next, top_next))
-        triangles.append((bottom_i, top_next, top_i))
+    walls = _wall_triangles(n)
 
+    triangles = np.concatenate([roof_tris + n, floor_tris, walls])
     return vertices, triangles
 
 # -------------------------------------------------
 # OSM FETCH
 # -------------------------------------------------
 
-def fetch_osm_buildings(lat, lon, km):
-    from geo.bounding_box import bounding_square
-    from geo.overpass import fetch_buildings, overpass_to_geojson
+OVERPASS_CACHE_DIR = "assets/overpass_cache"
+OVERPASS_CACHE_TTL = 24 * 60 * 60  # seconds
+
+
+def fetch_osm_buildings(lat, lon, km, cache_dir=OVERPASS_CACHE_DIR):
+    """
+    Fetches building footprints as GeoJSON, reusing a recent on-disk copy
+    for the same centre (to ~1 m) and radius instead of querying Overpass again.
+    """
+    cache_file = Path(cache_dir) / f"{round(lat, 5)}_{round(lon, 5)}_{float(km)}km.json"
+
+    if cache_file.exists() and time.time() - cache_file.stat().st_mtime < OVERPASS_CACHE_TTL:
+        with open(cache_file) as f:
+            return json.load(f)
+
+    if bounding_square is None:
+        raise ModuleNotFoundError(f"Overpass helpers (geo package) not found in {_SANDBOX_PROJECT}")
 
     square = bounding_square(lat, lon, km=km)
     geojson = overpass_to_geojson(fetch_buildings(square))
+
+    # Write then rename, so an interrupted run never leaves a truncated cache
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.tmp")
+    with open(tmp_file, "w") as f:
+        json.dump(geojson, f)
+    os.replace(tmp_file, cache_file)
+
     return geojson
 
 
@@ -151,13 +321,72 @@ def fetch_osm_buildings(lat, lon, km):
 # GEOJSON → EXTRUDED BUILDINGS
 # -------------------------------------------------
 
-def geojson_to_extruded_mesh(lat, lon, geojson):
-    meters_per_lat = 111_320
-    meters_per_lon = meters_per_lat * math.cos(math.radians(lat))
+def _weld_vertices(vertices, triangles, precision=1e-3):
+    """
+    Merges vertices that coincide to within `precision` metres (e.g. corners
+    shared by terraced houses) and remaps triangles onto the survivors.
+    Triangles that collapse to a line or point are dropped.
+    """
+    keys = np.round(vertices / precision).astype(np.int64)
+    _, first, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+
+    # Keep surviving vertices in first-seen order so buildings stay contiguous
+    order = np.argsort(first)
+    remap = np.empty_like(order)
+    remap[order] = np.arange(len(order))
+
+    triangles = remap[inverse.reshape(-1)][triangles].astype(np.int32)
+    a, b, c = triangles.T
+    triangles = triangles[(a != b) & (b != c) & (a != c)]
+
+    return vertices[first[order]], triangles
+
+
+def _merge_meshes(meshes):
+    """
+    Concatenates (vertices, triangles) pairs into one mesh, offsetting each
+    pair's indices by the vertices emitted before it.
+    """
+    meshes = [(verts, tris) for verts, tris in meshes if len(verts)]
+    if not meshes:
+        return np.empty((0, 3), np.float64), np.empty((0, 3), np.int32)
+
+    all_vertices, all_triangles = zip(*meshes)
+
+    vertex_counts = np.array([len(verts) for verts in all_vertices])
+    offsets = np.cumsum(vertex_counts) - vertex_counts
+    tri_counts = [len(tris) for tris in all_triangles]
+
+    triangles = np.concatenate(all_triangles)
+    triangles += np.repeat(offsets, tri_counts).astype(np.int32)[:, None]
 
-    all_vertices = []
-    all_triangles = []
-    vertex_offset = 0
+    return np.concatenate(all_vertices), triangles
+
+
+def _extrude_batch(footprints, heights):
+    """Extrudes a batch of footprints into a single merged mesh."""
+    return _merge_meshes(map(extrude_footprint, footprints, heights))
+
+
+# Footprints per pool task; each task returns one merged mesh, so pickling
+# cost scales with the number of batches rather than the number of buildings
+PARALLEL_BATCH_SIZE = 1000
+
+
+def geojson_to_extruded_mesh(lat, lon, geojson, workers=1):
+    """
+    Extrudes every Polygon feature and merges them into one mesh.
+    workers > 1 (or None for one per CPU) extrudes batches of footprints in a
+    process pool; callers must then run under an `if __name__ == "__main__"`
+    guard on platforms that spawn worker processes. Each footprint is cheap to
+    extrude, so the pool only pays off for very large cities on several cores.
+    """
+    meters_per_lon = METERS_PER_DEG_LAT * math.cos(math.radians(lat))
+    origin = np.array([lon, lat])
+    scale = np.array([meters_per_lon, METERS_PER_DEG_LAT])
+
+    footprints = []
+    heights = []
 
     for feature in geojson.get("features", []):
         geometry = feature.get("geometry", {})
@@ -168,37 +397,33 @@ def geojson_to_extruded_mesh(lat, lon, geojson):
         if not rings:
             continue
 
-        footprint = []
-
-        for coord in rings[0]:
-            if len(coord) < 2:
-                continue
-
-            point_lon, point_lat = coord[0], coord[1]
-            x = (point_lon - lon) * meters_per_lon
-            z = (point_lat - lat) * meters_per_lat
-            footprint.append((x, z))
+        try:
+            coords = np.asarray(rings[0], dtype=np.float64)
+        except ValueError:  # ragged ring (mixed 2D/3D or short positions)
+            coords = np.array([c[:2] for c in rings[0] if len(c) >= 2], dtype=np.float64)
 
-        if len(footprint) < 3:
+        if coords.ndim != 2 or coords.shape[1] < 2 or len(coords) < 3:
             continue
 
-        height = _building_height_meters(feature.get("properties", {}))
-
-        verts, tris = extrude_footprint(footprint, height)
-
-        # Add to global mesh
-        all_vertices.extend(verts)
-
-        for a, b, c in tris:
-            all_triangles.append((
-                a + vertex_offset,
-                b + vertex_offset,
-                c + vertex_offset
+        footprints.append((coords[:, :2] - origin) * scale)
+        heights.append(_building_height_meters(feature.get("properties", {})))
+
+    if workers == 1 or len(footprints) <= PARALLEL_BATCH_SIZE:
+        vertices, triangles = _extrude_batch(footprints, heights)
+    else:
+        starts = range(0, len(footprints), PARALLEL_BATCH_SIZE)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            batches = list(executor.map(
+                _extrude_batch,
+                [footprints[i:i + PARALLEL_BATCH_SIZE] for i in starts],
+                [heights[i:i + PARALLEL_BATCH_SIZE] for i in starts],
             ))
+        vertices, triangles = _merge_meshes(batches)
 
-        vertex_offset += len(verts)
+    if len(vertices) == 0:
+        return vertices, triangles
 
-    return all_vertices, all_triangles
+    return _weld_vertices(vertices, triangles)
 
 
 # -------------------------------------------------
@@ -217,36 +442,64 @@ def save_combined_obj(vertices, triangles, lat, lon, base_dir="assets/geo_buildi
 
     combined_file = run_folder / "combined.obj"
 
-    with open(combined_file, "w") as f:
-        # Write vertices
-        for x, y, z in vertices:
-            f.write(f"v {x} {y} {z}\n")
+    with open(combined_file, "w", buffering=1 << 20) as f:
+        np.savetxt(f, vertices, fmt="v %.3f %.3f %.3f")  # millimetre precision
 
         # OBJ is 1-indexed
-        for a, b, c in triangles:
-            f.write(f"f {a+1} {b+1} {c+1}\n")
+        np.savetxt(f, np.asarray(triangles) + 1, fmt="f %d %d %d")
 
     print(f"Saved city mesh to: {combined_file}")
     return combined_file
 
 
+def load_combined_obj(obj_file):
+    """
+    Reads an OBJ written by save_combined_obj back into NumPy arrays.
+    Only the plain "v x y z" / "f a b c" lines we emit are understood.
+    Returns:
+        vertices: (n, 3) float64 array
+        triangles: (m, 3) int32 array, 0-indexed
+    """
+    lines = Path(obj_file).read_bytes().split(b"\n")
+    v_lines = b" ".join(line[2:] for line in lines if line.startswith(b"v "))
+    f_lines = b" ".join(line[2:] for line in lines if line.startswith(b"f "))
+
+    vertices = np.fromstring(v_lines.decode("ascii"), dtype=np.float64, sep=" ")
+    triangles = np.fromstring(f_lines.decode("ascii"), dtype=np.int32, sep=" ")
+
+    # OBJ is 1-indexed
+    return vertices.reshape(-1, 3), triangles.reshape(-1, 3) - 1
+
+
 # -------------------------------------------------
 # PUBLIC API
 # -------------------------------------------------
 
-def generate_city(lat, lon, km=1):
+def generate_city_mesh(lat, lon, km=1, workers=1):
+    """
+    Builds the city mesh in memory without writing it anywhere.
+    Returns (vertices, triangles) arrays, or None if no buildings were found.
+    """
     print("Fetching OSM buildings...")
     geojson = fetch_osm_buildings(lat, lon, km)
 
     print("Extruding buildings...")
-    vertices, triangles = geojson_to_extruded_mesh(lat, lon, geojson)
+    vertices, triangles = geojson_to_extruded_mesh(lat, lon, geojson, workers=workers)
 
-    if not vertices:
+    if len(vertices) == 0:
         print("No buildings found.")
         return None
 
+    return vertices, triangles
+
+
+def generate_city(lat, lon, km=1, workers=1):
+    mesh = generate_city_mesh(lat, lon, km, workers=workers)
+    if mesh is None:
+        return None
+
     print("Saving combined OBJ...")
-    return save_combined_obj(vertices, triangles, lat, lon)
+    return save_combined_obj(*mesh, lat, lon)
 
 
 def get_latest_combined_obj(base_dir="assets/geo_buildings"):
@@ -255,11 +508,15 @@ def get_latest_combined_obj(base_dir="assets/geo_buildings"):
     if not base_path.exists():
         raise FileNotFoundError("Geo buildings directory does not exist.")
 
-    run_folders = [p for p in base_path.iterdir() if p.is_dir()]
-    if not run_folders:
+    # Run folders start with a UTC timestamp, so the greatest name is the newest
+    latest_folder = max(
+        (p for p in base_path.iterdir() if p.is_dir()),
+        default=None,
+        key=lambda p: p.name,
+    )
+    if latest_folder is None:
         raise FileNotFoundError("No run folders found.")
 
-    latest_folder = sorted(run_folders)[-1]
     combined_file = latest_folder / "combined.obj"
 
     if not combined_file.exists():
@@ -2,7 +2,8 @@ import pywavefront
 import numpy as np
 from pathlib import Path
 import math
-import sys
+
+from geojsonbldg import METERS_PER_DEG_LAT, fetch_osm_buildings
 
 def _to_float(value):
     if isinstance(value, (int, float)):
@@ -27,22 +28,23 @@ def _building_height_meters(properties):
 
 
 def _extrude_footprint(points_xz, top_y):
+    points_xz = np.asarray(points_xz, dtype=np.float64)
+
     # Remove repeated closing coordinate if present.
-    if len(points_xz) > 2 and points_xz[0] == points_xz[-1]:
+    if len(points_xz) > 2 and np.array_equal(points_xz[0], points_xz[-1]):
         points_xz = points_xz[:-1]
 
     count = len(points_xz)
     if count < 3:
-        return [], []
-
-    verts = []
-    edges = []
+        return np.empty((0, 3), np.float64), []
 
-    for x, z in points_xz:
-        verts.append((x, 0, z))
-    for x, z in points_xz:
-        verts.append((x, top_y, z))
+    # Bottom ring, then top ring
+    verts = np.zeros((2 * count, 3), np.float64)
+    verts[:count, 0::2] = points_xz
+    verts[count:, 0::2] = points_xz
+    verts[count:, 1] = top_y
 
+    edges = []
     for i in range(count):
         j = (i + 1) % count
         edges.append((i, j))
@@ -56,28 +58,17 @@ def load_extruded_geojson_buildings():
     """
     Loads extruded buildings. Coordinates are hardcoded to Sydney (demo requirement).
     """
-    sandbox_project = Path(__file__).resolve().parent / "sandbox project"
-    if str(sandbox_project) not in sys.path:
-        sys.path.append(str(sandbox_project))
-
-    try:
-        # keep imports for the Overpass helpers (must exist in sandbox project)
-        from geo.bounding_box import bounding_square
-        from geo.overpass import fetch_buildings, overpass_to_geojson
-    except Exception:
-        return []
-
     # Hardcode to Sydney coordinates (lat, lon)
     lat, lon = -33.8688, 151.2093
 
     try:
-        square = bounding_square(lat, lon, km=1)
-        footprints_geojson = overpass_to_geojson(fetch_buildings(square))
+        footprints_geojson = fetch_osm_buildings(lat, lon, km=1)
     except Exception:
         return []
 
-    meters_per_lat = 111_320
-    meters_per_lon = meters_per_lat * math.cos(math.radians(lat))
+    meters_per_lon = METERS_PER_DEG_LAT * math.cos(math.radians(lat))
+    origin = np.array([lon, lat])
+    scale = np.array([meters_per_lon, METERS_PER_DEG_LAT])
 
     buildings_from_geojson = []
     for index, feature in enumerate(footprints_geojson.get("features", []), start=1):
@@ -89,28 +80,24 @@ def load_extruded_geojson_buildings():
         if not rings:
             continue
 
-        footprint = []
-        for coord in rings[0]:
-            if len(coord) < 2:
-                continue
-            point_lon, point_lat = coord[0], coord[1]
-            x = (point_lon - lon) * meters_per_lon
-            z = (point_lat - lat) * meters_per_lat
-            footprint.append((x, z))
-
-        if len(footprint) < 3:
+        try:
+            coords = np.asarray(rings[0], dtype=np.float64)
+        except ValueError:  # ragged ring (mixed 2D/3D or short positions)
+            coords = np.array([c[:2] for c in rings[0] if len(c) >= 2], dtype=np.float64)
+        if coords.ndim != 2 or coords.shape[1] < 2 or len(coords) < 3:
             continue
 
+        footprint = (coords[:, :2] - origin) * scale
+
         top_y = -_building_height_meters(feature.get("properties", {}))
         verts, edges = _extrude_footprint(footprint, top_y)
-        if not verts:
+        if len(verts) == 0:
             continue
 
         footprint_points = (
-            footprint[:-1] if footprint[0] == footprint[-1] else footprint
+            footprint[:-1] if np.array_equal(footprint[0], footprint[-1]) else footprint
         )
-        centroid_x = sum(p[0] for p in footprint_points) / len(footprint_points)
-        centroid_z = sum(p[1] for p in footprint_points) / len(footprint_points)
+        centroid_x, centroid_z = footprint_points.mean(axis=0)
 
         props = feature.get("properties", {})
         address = (
@@ -143,34 +130,18 @@ def export_building_pywavefront(verts, edges, file_path):
     n = n_total // 2
     file_path.parent.mkdir(parents=True, exist_ok=True)
 
-    with file_path.open("w", encoding="utf-8") as f:
+    # 1-indexed OBJ faces, built as whole index arrays
+    i = np.arange(1, n - 1)
+    top = np.stack([np.full_like(i, n + 1), n + 1 + i, n + 2 + i], axis=1)  # fan
+    bottom = np.stack([np.ones_like(i), i + 2, i + 1], axis=1)  # reverse winding
+    i1 = np.arange(1, n + 1)
+    i2 = i1 % n + 1
+    walls = np.stack([i1, i2, i2 + n, i1, i2 + n, i1 + n], axis=1).reshape(-1, 3)
+
+    with file_path.open("w", encoding="utf-8", buffering=1 << 20) as f:
         f.write("# Generated by geojsonbuildingextrusion.export_building_pywavefront\n")
-        for (x, y, z) in verts:
-            f.write(f"v {float(x):.6f} {float(y):.6f} {float(z):.6f}\n")
-
-        # top face (fan)
-        top_start = n + 1
-        for i in range(1, n - 1):
-            a = top_start
-            b = top_start + i
-            c = top_start + i + 1
-            f.write(f"f {a} {b} {c}\n")
-
-        # bottom face (reverse winding)
-        for i in range(1, n - 1):
-            a = 1
-            b = i + 2
-            c = i + 1
-            f.write(f"f {a} {b} {c}\n")
-
-        # walls (split quad into two triangles)
-        for i in range(n):
-            i1 = i + 1
-            i2 = (i + 1) % n + 1
-            ti1 = i1 + n
-            ti2 = i2 + n
-            f.write(f"f {i1} {i2} {ti2}\n")
-            f.write(f"f {i1} {ti2} {ti1}\n")
+        np.savetxt(f, np.asarray(verts, dtype=np.float64), fmt="v %.3f %.3f %.3f")
+        np.savetxt(f, np.concatenate([top, bottom, walls]), fmt="f %d %d %d")
 
 
 # --- bridge code (timestamped filenames optional) ---
@@ -187,7 +158,8 @@ def generate_and_save_buildings(save_dir="assets/geo_buildings"):
 
     run_ts = datetime.utcnow().strftime("%Y%m%d%H%M%S%f")
     for i, building in enumerate(buildings, start=1):
-        verts = [(x, -y, z) for x, y, z in building["verts"]]  # flip Y for Ursina
+        # flip Y for Ursina (+ 0.0 turns -0.0 back into 0.0 for the OBJ text)
+        verts = building["verts"] * (1.0, -1.0, 1.0) + 0.0
         edges = building["edges"]
         file_path = save_path / f"building_{i}_{run_ts}.obj"
         export_building_pywavefront(verts, edges, file_path)
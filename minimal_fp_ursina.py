@@ -1,9 +1,8 @@
 from ursina import *
 from ursina.prefabs.first_person_controller import FirstPersonController
 import numpy as np
-import pywavefront
 
-from geojsonbldg import get_latest_combined_obj
+from geojsonbldg import generate_city_mesh, get_latest_combined_obj, load_combined_obj, save_combined_obj
 
 app = Ursina()
 
@@ -13,6 +12,8 @@ GROUND_SCALE = DESIRED_SCENE_SIZE * 1.2
 PLAYER_START_Y = 10  # keep spawn above ground while debugging floor collision issues
 PERLIN_REPEAT = 0.1
 WIREFRAME_COLOR = color.black
+CITY_LAT, CITY_LON = -33.8688, 151.2093  # Sydney, only used when no OBJ is cached
+CITY_KM = 1
 
 # === GROUND ===
 ground = Entity(
@@ -24,17 +25,33 @@ ground = Entity(
     y=0
 )
 
-# === LOAD COMBINED OBJ ===
-combined_obj = get_latest_combined_obj()
-if combined_obj is None:
-    print("No combined OBJ found in: assets/geo_buildings")
-    exit()
+# === LOAD CITY MESH ===
+try:
+    combined_obj = get_latest_combined_obj()
+except FileNotFoundError:
+    combined_obj = None
+
+if combined_obj is not None:
+    # Load vertices and faces (0-indexed triangles)
+    verts, faces = load_combined_obj(combined_obj)
+    city_source = f"combined city OBJ: {combined_obj.name}"
+else:
+    # Nothing cached yet: build in memory, skipping the OBJ write/parse round-trip
+    print("No combined OBJ found in: assets/geo_buildings, generating city")
+    try:
+        city_mesh = generate_city_mesh(CITY_LAT, CITY_LON, km=CITY_KM)
+    except Exception as e:  # missing geo helpers, network errors, ...
+        print("Could not generate city:", e)
+        city_mesh = None
+    if city_mesh is None:
+        exit()
+    verts, faces = city_mesh
+    # Cache for the next start; verts are normalized in place below, so save first
+    save_combined_obj(verts, faces, CITY_LAT, CITY_LON)
+    city_source = f"generated city at {CITY_LAT}, {CITY_LON}"
 
-# Load vertices and faces using pywavefront
-scene = pywavefront.Wavefront(str(combined_obj), collect_faces=True)
-verts = np.array(scene.vertices)
 if verts.size == 0:
-    print("No vertices found in OBJ:", combined_obj)
+    print("No vertices found in", city_source)
     exit()
 
 # Compute bounding box
@@ -48,20 +65,11 @@ combined_size = max_bounds - min_bounds
 scale_factor = DESIRED_SCENE_SIZE / max(combined_size[0], combined_size[2])
 
 # Shift & scale vertices
-for i, v in enumerate(verts):
-    verts[i] = [
-        (v[0] - center_xz.x) * scale_factor,
-        (v[1] - min_y) * scale_factor,
-        (v[2] - center_xz.z) * scale_factor
-    ]
-
-# Create Mesh for Ursina
-faces = []
-for mesh in scene.mesh_list:
-    for f in mesh.faces:
-        faces.append([idx + 1 for idx in f])  # OBJ indices are 1-based
+verts -= np.array([center_xz.x, min_y, center_xz.z])
+verts *= scale_factor
 
-city_model = Mesh(vertices=[Vec3(*v) for v in verts], triangles=[tuple(f) for f in faces])
+# Create Mesh for Ursina from plain lists (no per-vertex Vec3/tuple objects)
+city_model = Mesh(vertices=verts.tolist(), triangles=faces.reshape(-1).tolist())
 
 # === WRAP IN PARENT ENTITY ===
 geo_parent = Entity()  # parent container for combined city
@@ -75,16 +83,15 @@ city_entity = Entity(
     color=color.white
 )
 
-# Wireframe overlay
-wire = Entity(model=city_model, parent=city_entity, color=WIREFRAME_COLOR)
-wire.model.mode = 'lines'
-
 # Combine into single mesh for performance and enable collider
 geo_parent.combine()
 geo_parent.collider = 'mesh'
 geo_parent.static = True
 
-print(f"Loaded combined city OBJ: {combined_obj.name}, {len(verts)} vertices")
+# Wireframe overlay drawn from the same geometry (no second mesh/entity)
+geo_parent.setRenderModeFilledWireframe(WIREFRAME_COLOR)
+
+print(f"Loaded {city_source}, {len(verts)} vertices")
 
 # === PLAYER ===
 player = FirstPersonController()